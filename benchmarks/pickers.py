@@ -0,0 +1,54 @@
+"""Compare the different ways of picking an outcome for a random value.
+
+Run with `make benchmark`.
+"""
+import random
+
+from bisect import bisect_left
+from functools import partial
+from timeit import timeit
+
+from trustthedice import lib
+
+
+DRAWS = 200000
+
+EVENTS = {
+    "lottery": ["Win the lottery: 1 in 1000000"],
+    "roulette": ["red: 18 in 37", "black: 18 in 37"],
+    "rare first": [f"rare {i}: 1 in 1000" for i in range(9)],
+    "uniform": [f"side {i}: 1 in 40" for i in range(39)],
+}
+
+
+def linear_scan(probabilities, value):
+    for index, probability in enumerate(probabilities):
+        if value <= probability:
+            return index
+
+
+def main():
+    values = [random.random() for _ in range(DRAWS)]
+
+    for event_name, outcome_strings in EVENTS.items():
+        outcomes = lib.calculate_cumulative_probabilities(
+            [lib.parse_probable_outcome(string) for string in outcome_strings],
+            remainder_name="otherwise",
+        )
+        probabilities = [float(outcome.probability) for outcome in outcomes]
+
+        pickers = {
+            "pick_outcome": partial(lib.pick_outcome, outcomes=outcomes),
+            "linear scan": partial(linear_scan, probabilities),
+            "bisect": partial(bisect_left, probabilities),
+            "compiled": lib.compile_picker(probabilities),
+        }
+
+        print(f"{event_name} ({len(outcomes)} outcomes)")
+        for picker_name, picker in pickers.items():
+            seconds = timeit(lambda: [picker(value) for value in values], number=1)
+            print(f"  {picker_name:>12}: {seconds * 1000000 / DRAWS:.3f}us per draw")
+
+
+if __name__ == "__main__":
+    main()
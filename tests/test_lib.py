@@ -1,6 +1,8 @@
 import json
 
+from bisect import bisect_left
 from fractions import Fraction
+from functools import partial
 from os import path
 
 import pytest
@@ -28,6 +30,16 @@ def test_event_serialise():
     )
 
 
+def test_chain_serialise():
+    _assert_serialisable(
+        lib.RandomChain(
+            name="chaino",
+            start_event_name="evento",
+            transitions={"Safety": "evento", "Woodpeckero loco": "other evento"},
+        )
+    )
+
+
 def _assert_serialisable(original):
     simple_list = original.to_simple_list()
     # The whole point is to produce something that can be JSON serialised:
@@ -106,6 +118,7 @@ def test_initialise(tmp_path):
 
     assert path.isdir(project_dir)
     assert path.isfile(path.join(project_dir, "random_events"))
+    assert path.isfile(path.join(project_dir, "random_chains"))
 
     with pytest.raises(exceptions.ProjectAlreadyExistsError):
         lib.initialise(project_dir)
@@ -160,3 +173,187 @@ def test_loading_a_specific_event(tmp_path):
 
     with pytest.raises(exceptions.RandomEventDoesntExistError):
         lib.load_random_event(tmp_path, "this won't exist")
+
+
+def test_compile_picker_matches_pick_outcome():
+    probabilities = [0.000001, 0.01, 0.02, 0.5, 0.51, 0.9, 1.0]
+    picker = lib.compile_picker(probabilities)
+    outcomes = [
+        lib.ProbableOutcome(name=str(i), probability=probability)
+        for i, probability in enumerate(probabilities)
+    ]
+
+    values = probabilities + [0.0, 0.0000005, 0.015, 0.3, 0.505, 0.7, 0.95]
+    for value in values:
+        assert picker(value) == int(lib.pick_outcome(value, outcomes).name)
+
+
+def test_compile_picker_checks_likely_outcomes_first():
+    # The otherwise outcome should only need one comparison, even though it
+    # comes last.
+    splits = lib._optimal_splits([0.000001, 0.000001, 0.000001, 0.999997])
+    assert splits[0][3] == 3
+
+
+def test_compile_picker_falls_back_to_bisect_when_too_deep(monkeypatch):
+    monkeypatch.setattr(lib, "MAX_PICKER_DEPTH", 2)
+    probabilities = [(i + 1) / 8 for i in range(8)]
+    picker = lib.compile_picker(probabilities)
+
+    assert isinstance(picker, partial)
+    for value in [0.0, 0.1, 0.125, 0.3, 0.5, 0.51, 0.9, 1.0]:
+        assert picker(value) == bisect_left(probabilities, value)
+
+
+def test_compile_chain_indexes_reachable_events():
+    weather = lib.RandomEvent(
+        name="weather",
+        outcomes=[
+            lib.ProbableOutcome(name="Sunny", probability=Fraction(3, 4)),
+            lib.ProbableOutcome(name="Rainy", probability=Fraction(4, 4)),
+        ],
+    )
+    umbrella = lib.RandomEvent(
+        name="umbrella",
+        outcomes=[lib.ProbableOutcome(name="Umbrella", probability=Fraction(1, 1))],
+    )
+    unused = lib.RandomEvent(
+        name="unused",
+        outcomes=[lib.ProbableOutcome(name="Nope", probability=Fraction(1, 1))],
+    )
+    chain = lib.RandomChain(
+        name="day",
+        start_event_name="weather",
+        transitions={"Rainy": "umbrella", "Umbrella": "weather"},
+    )
+
+    table = lib.compile_chain(chain, [unused, umbrella, weather])
+
+    assert [
+        (probabilities, names, next_indexes)
+        for (probabilities, _, names, next_indexes) in table
+    ] == [([0.75, 1.0], ["Sunny", "Rainy"], [0, 1]), ([1.0], ["Umbrella"], [0])]
+
+    weather_picker = table[0][1]
+    assert weather_picker(0.75) == 0
+    assert weather_picker(0.7500001) == 1
+    assert weather_picker(1.0) == 1
+
+    values = iter([0.5, 0.9, 0.1, 0.75])
+    outcome_names = list(lib.run_chain(table, 4, lambda: next(values)))
+    assert outcome_names == ["Sunny", "Rainy", "Umbrella", "Sunny"]
+
+
+def test_compile_chain_needs_all_events():
+    weather = lib.RandomEvent(
+        name="weather",
+        outcomes=[lib.ProbableOutcome(name="Rainy", probability=Fraction(1, 1))],
+    )
+    chain = lib.RandomChain(
+        name="day", start_event_name="weather", transitions={"Rainy": "umbrella"}
+    )
+
+    with pytest.raises(exceptions.ChainTransitionEventDoesntExistError):
+        lib.compile_chain(chain, [weather])
+
+    chain = lib.RandomChain(name="day", start_event_name="night")
+    with pytest.raises(exceptions.ChainStartEventDoesntExistError):
+        lib.compile_chain(chain, [weather])
+
+
+def test_compile_chain_needs_all_transition_outcomes():
+    weather = lib.RandomEvent(
+        name="weather",
+        outcomes=[lib.ProbableOutcome(name="Rainy", probability=Fraction(1, 1))],
+    )
+    chain = lib.RandomChain(
+        name="day", start_event_name="weather", transitions={"Rany": "weather"}
+    )
+
+    with pytest.raises(exceptions.ChainTransitionOutcomeDoesntExistError):
+        lib.compile_chain(chain, [weather])
+
+
+def test_chain_stationary_distribution():
+    weather = lib.RandomEvent(
+        name="weather",
+        outcomes=[
+            lib.ProbableOutcome(name="Sunny", probability=Fraction(3, 4)),
+            lib.ProbableOutcome(name="Rainy", probability=Fraction(4, 4)),
+        ],
+    )
+    umbrella = lib.RandomEvent(
+        name="umbrella",
+        outcomes=[lib.ProbableOutcome(name="Umbrella", probability=Fraction(1, 1))],
+    )
+    chain = lib.RandomChain(
+        name="day",
+        start_event_name="weather",
+        transitions={"Rainy": "umbrella", "Umbrella": "weather"},
+    )
+    table = lib.compile_chain(chain, [weather, umbrella])
+
+    # Every rainy step is followed by an umbrella step, so the weather event
+    # gets rolled 4 times for every umbrella: 3 sunny, 1 rainy (and 1 umbrella).
+    stationary = lib.chain_stationary_distribution(table)
+    assert stationary[0] == pytest.approx([0.6, 0.2])
+    assert stationary[1] == pytest.approx([0.2])
+
+    values = iter([0.5, 0.9, 0.1, 0.75])
+    assert lib.count_chain_outcomes(table, 4, lambda: next(values)) == [[2, 1], [1]]
+
+
+def test_saving_and_loading_a_random_chain(tmp_path):
+    with open(path.join(tmp_path, "random_chains"), "w") as out:
+        out.write("")
+
+    chain = lib.RandomChain(
+        name="day", start_event_name="weather", transitions={"Rainy": "umbrella"}
+    )
+    lib.save_random_chain(tmp_path, chain)
+
+    assert lib.load_random_chain(tmp_path, "day") == chain
+
+    with pytest.raises(exceptions.RandomChainExistsError):
+        lib.save_random_chain(tmp_path, chain)
+
+    with pytest.raises(exceptions.RandomChainDoesntExistError):
+        lib.load_random_chain(tmp_path, "night")
+
+
+def test_stratified_values_have_one_value_per_stratum():
+    values = lib.stratified_values(100)
+
+    assert sorted(int(value * 100) for value in values) == list(range(100))
+
+
+def test_sobol_values_are_evenly_spread():
+    values = lib.sobol_values(64)
+
+    assert len(values) == 64
+    assert sorted(int(value * 64) for value in values) == list(range(64))
+
+
+def test_antithetic_values_come_in_pairs():
+    values = lib.antithetic_values(10)
+
+    for value, other_value in zip(values[::2], values[1::2]):
+        assert value + other_value == pytest.approx(1.0)
+
+
+def test_sample_outcomes_reports_variance():
+    outcomes = lib.calculate_cumulative_probabilities(
+        [lib.ProbableOutcome(name="Heads", probability=Fraction(1, 2))],
+        remainder_name="Tails",
+    )
+
+    # Half of the strata are below 0.5, so every batch is exactly half heads.
+    results = lib.sample_outcomes(outcomes, "stratified", draws=100, repeats=10)
+    assert results == [(0.5, 0, 0.0025), (0.5, 0, 0.0025)]
+
+    [(mean, variance, independent_variance), _] = lib.sample_outcomes(
+        outcomes, "independent", draws=100, repeats=10
+    )
+    assert 0 < mean < 1
+    assert variance > 0
+    assert independent_variance == 0.0025
@@ -1,5 +1,6 @@
 import random
 
+from collections import Counter
 from functools import wraps
 
 import click
@@ -82,6 +83,41 @@ def save_random_event(name, outcomes, otherwise, overwrite):
     lib.save_random_event(project_dir, random_event, overwrite)
 
 
+@events.command("sample")
+@click.argument("name", type=str)
+@click.option("--draws", type=click.IntRange(min=1), default=1000)
+@click.option(
+    "--method",
+    type=click.Choice(list(lib.SAMPLING_METHODS)),
+    default="independent",
+    help="How to choose the random values for each batch of draws",
+)
+@click.option(
+    "--repeats",
+    type=click.IntRange(min=2),
+    default=20,
+    help="How many batches to draw (to measure the variance of the estimates)",
+)
+@handle_errors_nicely
+def sample_random_event(name, draws, method, repeats):
+    project_dir = PROJECT_DIR
+
+    event = lib.load_random_event(project_dir, name)
+    results = lib.sample_outcomes(event.outcomes, method, draws, repeats)
+
+    for outcome, (mean, variance, independent_variance) in zip(
+        event.outcomes, results
+    ):
+        if variance:
+            reduction = f"{independent_variance / variance:.1f}x reduction"
+        else:
+            reduction = "no variance at all"
+        click.echo(
+            f"{outcome.name}: {mean:.4f} (variance {variance:.2e} vs "
+            f"{independent_variance:.2e} for independent draws, {reduction})"
+        )
+
+
 @main.command("random")
 @click.option(
     "--outcome", "-oc", "outcomes", multiple=True, type=ProbableOutcomeParamType()
@@ -101,7 +137,77 @@ def pick_random_outcome(outcomes, otherwise, saved_event_name):
         outcomes = lib.calculate_cumulative_probabilities(
             outcomes, remainder_name=otherwise
         )
-    value = random.random()
-    chosen_outcome = lib.pick_outcome(value, outcomes)
+    pick = lib.compile_outcomes(outcomes)
+    chosen_outcome = pick(random.random())
 
     click.echo(chosen_outcome.name)
+
+
+@main.group()
+def chains():
+    pass
+
+
+@chains.command("save")
+@click.argument("name", type=str)
+@click.option("--start", "start_event_name", type=str, required=True)
+@click.option(
+    "--transition",
+    "-t",
+    "transitions",
+    multiple=True,
+    type=(str, str),
+    help="An outcome name and the name of the event to roll after it",
+)
+@click.option("--overwrite/--no-overwrite", default=False)
+@handle_errors_nicely
+def save_random_chain(name, start_event_name, transitions, overwrite):
+    project_dir = PROJECT_DIR
+
+    random_chain = lib.RandomChain(
+        name=name, start_event_name=start_event_name, transitions=dict(transitions)
+    )
+    # Compiling checks that all of the events and outcomes actually exist.
+    lib.compile_chain(random_chain, lib.load_random_events(project_dir))
+    lib.save_random_chain(project_dir, random_chain, overwrite)
+
+
+@chains.command("run")
+@click.argument("name", type=str)
+@click.option("--steps", type=click.IntRange(min=0), default=1)
+@click.option(
+    "--summary/--no-summary",
+    default=False,
+    help="Show how often each outcome came up (and would in the long run)",
+)
+@handle_errors_nicely
+def run_random_chain(name, steps, summary):
+    project_dir = PROJECT_DIR
+
+    random_chain = lib.load_random_chain(project_dir, name)
+    table = lib.compile_chain(random_chain, lib.load_random_events(project_dir))
+
+    if not summary:
+        for outcome_name in lib.run_chain(table, steps):
+            click.echo(outcome_name)
+        return
+
+    counts = Counter()
+    stationary = Counter()
+    for (_, _, names, _), row_counts, row_stationary in zip(
+        table,
+        lib.count_chain_outcomes(table, steps),
+        lib.chain_stationary_distribution(table),
+    ):
+        for outcome_name, count, proportion in zip(
+            names, row_counts, row_stationary
+        ):
+            counts[outcome_name] += count
+            stationary[outcome_name] += proportion
+
+    for outcome_name, count in counts.most_common():
+        proportion = count / steps if steps else 0
+        click.echo(
+            f"{outcome_name}: {count} ({proportion:.4f}, "
+            f"long run {stationary[outcome_name]:.4f})"
+        )
@@ -151,3 +151,68 @@ class CantHaveOutcomesAndSavedEventError(BaseError):
             Either use just the saved event (--from-saved) or specify the
             outcomes explicitly (--outcome). You can't use both.
         """
+
+
+class RandomChainExistsError(BaseError):
+    def title(self):
+        return "A random chain with this name already exists"
+
+    def description(self):
+        return """
+            Either choose a different name, or save using the --overwrite flag.
+        """
+
+
+class RandomChainDoesntExistError(BaseError):
+    def title(self):
+        return "No chain with this name exists"
+
+    def description(self):
+        return """
+            Check the name. Case matters!
+            (i.e. 'Hoohah' is not the same as 'hoohah')
+        """
+
+
+class ChainStartEventDoesntExistError(BaseError):
+    def __init__(self, event_name):
+        self.event_name = event_name
+
+    def title(self):
+        return "The chain's start event doesn't exist"
+
+    def description(self):
+        return f"""
+            There is no saved event called '{self.event_name}' to start with.
+            Save it first with `trustthedice events save`.
+        """
+
+
+class ChainTransitionEventDoesntExistError(BaseError):
+    def __init__(self, outcome_name, event_name):
+        self.outcome_name = outcome_name
+        self.event_name = event_name
+
+    def title(self):
+        return "A chain transition goes to an event that doesn't exist"
+
+    def description(self):
+        return f"""
+            The transition from '{self.outcome_name}' goes to '{self.event_name}',
+            but there is no saved event with that name.
+        """
+
+
+class ChainTransitionOutcomeDoesntExistError(BaseError):
+    def __init__(self, outcome_name):
+        self.outcome_name = outcome_name
+
+    def title(self):
+        return "A chain transition starts from an outcome that can't happen"
+
+    def description(self):
+        return f"""
+            None of the events in the chain have an outcome called
+            '{self.outcome_name}', so this transition would never be used.
+            Check the name. Case matters!
+        """
@@ -1,12 +1,23 @@
+import statistics
+
+from bisect import bisect_left
 from fractions import Fraction
+from functools import partial
 from os import makedirs, path
-from typing import List
+from random import random
+from typing import Dict, List
 
 from attr import attrs, attrib
 
 from . import exceptions, serialise
 
 
+# Each comparison in a compiled picker adds a level of nested parentheses to
+# its expression, and Python's parser refuses expressions nested much deeper
+# than 200 levels.
+MAX_PICKER_DEPTH = 100
+
+
 @attrs
 class ProbableOutcome(serialise.Serialisable):
     """A probable outcome has a name and a probability.
@@ -53,6 +64,49 @@ class RandomEvent(serialise.Serialisable):
         return RandomEvent(name, outcomes)
 
 
+@attrs
+class RandomChain(serialise.Serialisable):
+    """A random chain starts with a random event, and then uses each outcome to
+    decide which random event to roll next.
+
+    An outcome without a transition means that the same event is rolled again.
+
+    Transitions are keyed by outcome name only, so if two events in a chain
+    share an outcome name (e.g. 'Yes') then both go on to the same event.
+    """
+
+    name: str = attrib()
+    start_event_name: str = attrib()
+    transitions: Dict[str, str] = attrib(factory=dict)
+
+    def to_simple_list(self):
+        return [
+            self.name,
+            self.start_event_name,
+            [
+                [outcome_name, event_name]
+                for outcome_name, event_name in self.transitions.items()
+            ],
+        ]
+
+    @classmethod
+    def from_simple_list(cls, simple_list):
+        if not isinstance(simple_list, list) or len(simple_list) != 3:
+            raise exceptions.SerialisationError(
+                f"Expected a list [str, str, list] but got {simple_list}"
+            )
+        [name, start_event_name, raw_transitions] = simple_list
+        transitions = {}
+        for raw_transition in raw_transitions:
+            if not isinstance(raw_transition, list) or len(raw_transition) != 2:
+                raise exceptions.SerialisationError(
+                    f"Expected a list [str, str] but got {raw_transition}"
+                )
+            [outcome_name, event_name] = raw_transition
+            transitions[outcome_name] = event_name
+        return RandomChain(name, start_event_name, transitions)
+
+
 def parse_probable_outcome(outcome_string):
     """Parse a probable outcome from a string.
 
@@ -143,16 +197,365 @@ def pick_outcome(value, outcomes):
     raise exceptions.CouldntPickOutcomeError()
 
 
+def compile_outcomes(outcomes):
+    """Return a function that picks an outcome for a value, like pick_outcome.
+
+    This is worth it when picking lots of outcomes from the same list: see
+    compile_picker.
+
+    >>> o1 = ProbableOutcome(name="a", probability=Fraction(1, 1000000))
+    >>> o2 = ProbableOutcome(name="b", probability=Fraction(1, 1))
+    >>> pick = compile_outcomes([o1, o2])
+    >>> pick(0.0000001).name, pick(0.5).name
+    ('a', 'b')
+    """
+    picker = compile_picker([float(outcome.probability) for outcome in outcomes])
+    return lambda value: outcomes[picker(value)]
+
+
+def compile_picker(probabilities):
+    """Return a function that gives the index of the first (cumulative)
+    probability that is greater than or equal to a value.
+
+    The comparisons are arranged as an optimal alphabetic tree: the tree (that
+    keeps the outcomes in order) with the lowest expected number of comparisons
+    per value. Likely outcomes are found after fewer comparisons than unlikely
+    ones, and the expected number is within 2 of the entropy of the outcomes.
+
+    The tree is written out as a single Python expression and compiled. If it
+    would be too deep for that, bisecting is used instead.
+
+    >>> picker = compile_picker([0.000001, 0.5, 1.0])
+    >>> picker(0.0000001), picker(0.3), picker(0.9)
+    (0, 1, 2)
+    """
+    weights = [
+        high - low for low, high in zip([0.0] + probabilities[:-1], probabilities)
+    ]
+    splits = _optimal_splits(weights)
+    last = len(probabilities) - 1
+    expression = _picker_expression(probabilities, splits, 0, last, 0)
+    if expression is None:
+        return partial(bisect_left, probabilities)
+    return eval(f"lambda value: {expression}", {})
+
+
+def _optimal_splits(weights):
+    """Find the optimal alphabetic tree for some (leaf) weights.
+
+    This is Knuth's dynamic programming algorithm for optimal binary search
+    trees, which takes O(n^2) time. splits[low][high] is where the leaves from
+    low to high (inclusive) should be split: leaves before the split go left.
+    """
+    count = len(weights)
+    totals = [0.0]
+    for weight in weights:
+        totals.append(totals[-1] + weight)
+
+    costs = [[0.0] * count for _ in range(count)]
+    splits = [[0] * count for _ in range(count)]
+    for low in range(count - 1):
+        splits[low][low + 1] = low + 1
+        costs[low][low + 1] = totals[low + 2] - totals[low]
+
+    for size in range(3, count + 1):
+        for low in range(count - size + 1):
+            high = low + size - 1
+            # The best split never moves left as leaves are added on the
+            # right (or right as leaves are removed from the left).
+            best_split = min(
+                range(splits[low][high - 1], splits[low + 1][high] + 1),
+                key=lambda split: costs[low][split - 1] + costs[split][high],
+            )
+            splits[low][high] = best_split
+            costs[low][high] = (
+                costs[low][best_split - 1]
+                + costs[best_split][high]
+                + totals[high + 1]
+                - totals[low]
+            )
+
+    return splits
+
+
+def _picker_expression(probabilities, splits, low, high, depth):
+    if low == high:
+        return str(low)
+    if depth >= MAX_PICKER_DEPTH:
+        return None
+
+    split = splits[low][high]
+    below = _picker_expression(probabilities, splits, low, split - 1, depth + 1)
+    above = _picker_expression(probabilities, splits, split, high, depth + 1)
+    if below is None or above is None:
+        return None
+    return f"({below} if value <= {probabilities[split - 1]!r} else {above})"
+
+
+def compile_chain(random_chain, random_events):
+    """Turn a chain into a table that can be stepped through without any lookups.
+
+    Every event reachable from the chain's start event is given an index (the
+    start event is always 0). The table has one row per event, and each row is
+    a tuple of (cumulative probabilities, picker, outcome names, next event
+    indexes), where the picker is built from the probabilities by
+    compile_picker.
+
+    The probabilities are stored as floats: comparing random values against
+    Fractions is far too slow when running lots of steps.
+    """
+    events_by_name = {event.name: event for event in random_events}
+
+    if random_chain.start_event_name not in events_by_name:
+        raise exceptions.ChainStartEventDoesntExistError(random_chain.start_event_name)
+    for outcome_name, event_name in random_chain.transitions.items():
+        if event_name not in events_by_name:
+            raise exceptions.ChainTransitionEventDoesntExistError(
+                outcome_name, event_name
+            )
+
+    indexes = {random_chain.start_event_name: 0}
+    pending = [random_chain.start_event_name]
+    rows = []
+
+    while pending:
+        event_name = pending.pop(0)
+        event = events_by_name[event_name]
+
+        probabilities = []
+        names = []
+        next_indexes = []
+        for outcome in event.outcomes:
+            next_event_name = random_chain.transitions.get(outcome.name, event_name)
+            if next_event_name not in indexes:
+                indexes[next_event_name] = len(indexes)
+                pending.append(next_event_name)
+            probabilities.append(float(outcome.probability))
+            names.append(outcome.name)
+            next_indexes.append(indexes[next_event_name])
+
+        rows.append(
+            (probabilities, compile_picker(probabilities), names, next_indexes)
+        )
+
+    reachable_outcome_names = {name for (_, _, names, _) in rows for name in names}
+    for outcome_name in random_chain.transitions:
+        if outcome_name not in reachable_outcome_names:
+            raise exceptions.ChainTransitionOutcomeDoesntExistError(outcome_name)
+
+    return rows
+
+
+def run_chain(table, steps, get_random_value=random):
+    """Step through a compiled chain, yielding the name of each outcome.
+
+    >>> coin = RandomEvent("coin", [
+    ...     ProbableOutcome("Heads", Fraction(1, 2)),
+    ...     ProbableOutcome("Tails", Fraction(2, 2)),
+    ... ])
+    >>> die = RandomEvent("die", [ProbableOutcome("Six", Fraction(1, 1))])
+    >>> table = compile_chain(RandomChain("c", "coin", {"Tails": "die"}), [coin, die])
+    >>> values = iter([0.2, 0.7, 0.1])
+    >>> list(run_chain(table, 3, lambda: next(values)))
+    ['Heads', 'Tails', 'Six']
+    """
+    index = 0
+    for _ in range(steps):
+        _, picker, names, next_indexes = table[index]
+        position = picker(get_random_value())
+        if position == len(names):
+            raise exceptions.CouldntPickOutcomeError()
+        yield names[position]
+        index = next_indexes[position]
+
+
+def count_chain_outcomes(table, steps, get_random_value=random):
+    """Step through a compiled chain, counting how often each outcome comes up.
+
+    This is much quicker than run_chain when only the totals matter. The counts
+    have the same shape as the table: one list of counts per row.
+
+    >>> coin = RandomEvent("coin", [
+    ...     ProbableOutcome("Heads", Fraction(1, 2)),
+    ...     ProbableOutcome("Tails", Fraction(2, 2)),
+    ... ])
+    >>> die = RandomEvent("die", [ProbableOutcome("Six", Fraction(1, 1))])
+    >>> table = compile_chain(RandomChain("c", "coin", {"Tails": "die"}), [coin, die])
+    >>> values = iter([0.2, 0.7, 0.1])
+    >>> count_chain_outcomes(table, 3, lambda: next(values))
+    [[1, 1], [1]]
+    """
+    counts = [[0] * len(names) for (_, _, names, _) in table]
+    index = 0
+    for _ in range(steps):
+        _, picker, _, next_indexes = table[index]
+        position = picker(get_random_value())
+        counts[index][position] += 1
+        index = next_indexes[position]
+    return counts
+
+
+def chain_stationary_distribution(table, iterations=10000, tolerance=1e-12):
+    """Return the long run proportion of steps that give each outcome.
+
+    The result has the same shape as the table: one list per row. It is found
+    by power iteration, starting from the start event. Each iteration is
+    averaged with the previous one, so that chains which cycle between events
+    (and so never settle down) still converge to the same answer.
+
+    >>> coin = RandomEvent("coin", [
+    ...     ProbableOutcome("Heads", Fraction(1, 2)),
+    ...     ProbableOutcome("Tails", Fraction(2, 2)),
+    ... ])
+    >>> die = RandomEvent("die", [ProbableOutcome("Six", Fraction(1, 1))])
+    >>> transitions = {"Tails": "die", "Six": "coin"}
+    >>> table = compile_chain(RandomChain("c", "coin", transitions), [coin, die])
+    >>> [[round(p, 6) for p in row] for row in chain_stationary_distribution(table)]
+    [[0.333333, 0.333333], [0.333333]]
+    """
+    row_probabilities = [
+        [high - low for low, high in zip([0.0] + probabilities, probabilities)]
+        for (probabilities, _, _, _) in table
+    ]
+
+    event_weights = [1.0] + [0.0] * (len(table) - 1)
+    for _ in range(iterations):
+        next_weights = [weight / 2 for weight in event_weights]
+        for weight, probabilities, (_, _, _, next_indexes) in zip(
+            event_weights, row_probabilities, table
+        ):
+            for probability, next_index in zip(probabilities, next_indexes):
+                next_weights[next_index] += weight * probability / 2
+
+        change = max(abs(a - b) for a, b in zip(event_weights, next_weights))
+        event_weights = next_weights
+        if change < tolerance:
+            break
+
+    return [
+        [weight * probability for probability in probabilities]
+        for weight, probabilities in zip(event_weights, row_probabilities)
+    ]
+
+
+def independent_values(count, get_random_value=random):
+    """Return count random values, each chosen independently.
+    """
+    return [get_random_value() for _ in range(count)]
+
+
+def stratified_values(count, get_random_value=random):
+    """Return count random values, one from each of count equal slices of [0, 1).
+
+    >>> stratified_values(4, lambda: 0.5)
+    [0.125, 0.375, 0.625, 0.875]
+    """
+    return [(i + get_random_value()) / count for i in range(count)]
+
+
+def sobol_values(count, get_random_value=random):
+    """Return count values from a randomly shifted Sobol sequence.
+
+    We only ever need one dimension, and the one dimensional Sobol sequence is
+    the van der Corput sequence in base 2. Shifting every value by the same
+    random amount (wrapping around at 1) keeps the values evenly spread.
+
+    >>> sobol_values(5, lambda: 0.0)
+    [0.0, 0.5, 0.25, 0.75, 0.125]
+    """
+    # The first 2n values of the sequence are the first n values, followed by
+    # the same n values moved along by half of the current gap.
+    sequence = [0.0]
+    gap = 0.5
+    while len(sequence) < count:
+        sequence.extend([value + gap for value in sequence])
+        gap /= 2
+
+    shift = get_random_value()
+    return [(value + shift) % 1.0 for value in sequence[:count]]
+
+
+def antithetic_values(count, get_random_value=random):
+    """Return count random values in pairs of value and 1 - value.
+
+    >>> values = iter([0.1, 0.3, 0.6])
+    >>> antithetic_values(5, lambda: next(values))
+    [0.1, 0.9, 0.3, 0.7, 0.6]
+    """
+    values = []
+    for _ in range(count // 2):
+        value = get_random_value()
+        values.extend([value, 1 - value])
+    if count % 2:
+        values.append(get_random_value())
+    return values
+
+
+SAMPLING_METHODS = {
+    "independent": independent_values,
+    "stratified": stratified_values,
+    "sobol": sobol_values,
+    "antithetic": antithetic_values,
+}
+
+
+def count_outcomes(outcomes, values):
+    """Count how many of the values pick each of the (cumulative) outcomes.
+
+    >>> o1 = ProbableOutcome(name="a", probability=Fraction(1, 4))
+    >>> o2 = ProbableOutcome(name="b", probability=Fraction(1, 1))
+    >>> count_outcomes([o1, o2], [0.1, 0.5, 0.9])
+    [1, 2]
+    """
+    picker = compile_picker([float(outcome.probability) for outcome in outcomes])
+    counts = [0] * len(outcomes)
+    for value in values:
+        counts[picker(value)] += 1
+    return counts
+
+
+def sample_outcomes(outcomes, method, draws, repeats, get_random_value=random):
+    """Estimate the probability of each outcome, and how good the estimate is.
+
+    A batch of draws values is generated with the given sampling method,
+    repeats times. For each outcome, returns a tuple of (mean of the estimates,
+    variance of the estimates, variance if the values had been independent).
+    The ratio of the last two is the variance reduction due to the method.
+    """
+    make_values = SAMPLING_METHODS[method]
+    all_counts = [
+        count_outcomes(outcomes, make_values(draws, get_random_value))
+        for _ in range(repeats)
+    ]
+
+    results = []
+    previous_probability = 0
+    for index, outcome in enumerate(outcomes):
+        # The counts are whole numbers, so their variance is worked out
+        # exactly: a method that always gives the same counts has no variance.
+        outcome_counts = [counts[index] for counts in all_counts]
+        mean = statistics.mean(outcome_counts) / draws
+        variance = statistics.variance(outcome_counts) / draws ** 2
+
+        probability = float(outcome.probability - previous_probability)
+        previous_probability = outcome.probability
+        independent_variance = probability * (1 - probability) / draws
+
+        results.append((mean, variance, independent_variance))
+    return results
+
+
 def initialise(project_dir, ignore_existing=None):
     if path.exists(project_dir) and not ignore_existing:
         raise exceptions.ProjectAlreadyExistsError(project_dir)
 
     makedirs(project_dir, exist_ok=True)
 
-    events_filename = path.join(project_dir, "random_events")
-    if not path.exists(events_filename):
-        with open(events_filename, "w") as out:
-            out.write("")
+    for relative_filename in ["random_events", "random_chains"]:
+        filename = path.join(project_dir, relative_filename)
+        if not path.exists(filename):
+            with open(filename, "w") as out:
+                out.write("")
 
 
 def _get_and_assert_filename(project_dir, relative_filename):
@@ -203,3 +606,38 @@ def save_random_event(project_dir, random_event, overwrite=None):
     with open(filename, "w") as output_file:
         for event in events_to_write:
             serialise.write(event, output_file)
+
+
+def load_random_chains(project_dir):
+    filename = _get_and_assert_filename(project_dir, "random_chains")
+    with open(filename, "r") as input_file:
+        return list(serialise.read_many(input_file, RandomChain))
+
+
+def load_random_chain(project_dir, desired_chain_name):
+    for chain in load_random_chains(project_dir):
+        if chain.name == desired_chain_name:
+            return chain
+    raise exceptions.RandomChainDoesntExistError()
+
+
+def save_random_chain(project_dir, random_chain, overwrite=None):
+    chain_with_same_name = None
+    all_other_chains = []
+
+    for existing_chain in load_random_chains(project_dir):
+        if existing_chain.name == random_chain.name:
+            chain_with_same_name = existing_chain
+        else:
+            all_other_chains.append(existing_chain)
+
+    if chain_with_same_name is not None and not overwrite:
+        raise exceptions.RandomChainExistsError()
+
+    filename = _get_and_assert_filename(project_dir, "random_chains")
+
+    chains_to_write = all_other_chains + [random_chain]
+
+    with open(filename, "w") as output_file:
+        for chain in chains_to_write:
+            serialise.write(chain, output_file)